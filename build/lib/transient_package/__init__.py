@@ -0,0 +1 @@
+from .transient import create_transient_package
@@ -0,0 +1,443 @@
+import click
+import functools
+import logging
+import os
+import re
+import sys
+
+from ..transient import TRANSIENT_GENERATOR, create_transient_package
+
+# Create a logger object for this module
+logger = logging.getLogger(__name__)
+
+# Characters that indicate a version specifier rather than a plain version
+_SPECIFIER_CHARS = frozenset("!,<=>~")
+
+# Release segment (major, minor and micro) of a version, after an optional epoch
+_RELEASE_RE = re.compile(r"(?:\d+!)?(\d+)(?:\.(\d+))?(?:\.(\d+))?")
+
+# Delimiter between the version and the wheel metadata in the probe output
+_DISTRIBUTION_DELIMITER = "---"
+
+# Cache of probed distributions, keyed by (interpreter, package)
+_distributions = {}
+
+##### ##### ##### ##### #####
+
+def create_options(func):
+  @click.option(
+    "-s",
+    "--source",
+    multiple=True,
+    help="""
+      Name of the transient package to be created
+    """,
+    required=True,
+  )
+  @click.option(
+    "-sv",
+    "--source-version",
+    multiple=True,
+    help="""
+      Version of the transient package to be created
+    """,
+  )
+  @click.option(
+    "-t",
+    "--target",
+    multiple=True,
+    help="""
+      Name of the target package that the transient package will depend on
+    """,
+    required=True,
+  )
+  @click.option(
+    "-tv",
+    "--target-version",
+    multiple=True,
+    help="""
+      Version of the target package that the transient package will depend on
+    """,
+  )
+  @functools.wraps(func)
+  def wrapper(*args, **kwargs):
+    return func(*args, **kwargs)
+  return wrapper
+
+def pip_options(func):
+  @click.option(
+    "-i",
+    "--interpreter",
+    default=sys.executable,
+    help="""
+      Path to the Python interpreter to be used when calling pip
+    """,
+  )
+  @functools.wraps(func)
+  def wrapper(*args, **kwargs):
+    return func(*args, **kwargs)
+  return wrapper
+
+##### ##### ##### ##### #####
+
+def _invoke_code(interpreter, code):
+  import subprocess
+
+  # Run the provided code using the specified interpreter and capture the decoded output
+  result = subprocess.run(
+    [interpreter, "-c", code],
+    stdout=subprocess.PIPE,
+    stderr=subprocess.DEVNULL,
+    encoding="utf-8",
+    check=True,
+  )
+
+  # Return the output, stripping any trailing whitespace
+  return result.stdout.rstrip()
+
+def _spawn_and_wait(args):
+  import subprocess
+
+  # Fall back to subprocess on platforms without posix_spawn
+  if not hasattr(os, "posix_spawnp"):
+    subprocess.check_call(args)
+    return
+
+  # Spawn the process without forking the current one and wait for it
+  pid = os.posix_spawnp(args[0], args, os.environ)
+  _pid, status = os.waitpid(pid, 0)
+
+  # Convert the wait status to a return code as subprocess does
+  returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+
+  # Raise an error if the process failed
+  if returncode != 0:
+    raise subprocess.CalledProcessError(returncode, args)
+
+def _get_distribution(interpreter, package):
+  # Return cached result if this package was already queried
+  key = (interpreter, package)
+  if key in _distributions:
+    return _distributions[key]
+
+  if os.path.abspath(interpreter) == os.path.abspath(sys.executable):
+    import importlib.metadata
+
+    # Query the current interpreter in-process
+    distribution = importlib.metadata.distribution(package)
+    version, wheel = distribution.version, (distribution.read_text("WHEEL") or "").rstrip()
+  else:
+    # Retrieve the version and the wheel metadata in a single interpreter run
+    output = _invoke_code(interpreter, (
+      "import importlib.metadata as m; "
+      f"d = m.distribution('{package}'); "
+      "print(d.version); "
+      f"print('{_DISTRIBUTION_DELIMITER}'); "
+      "print(d.read_text('WHEEL'))"
+    ))
+
+    # Split the output into the version and the wheel metadata
+    version, _, wheel = output.partition(f"\n{_DISTRIBUTION_DELIMITER}\n")
+
+  # Cache and return the result
+  _distributions[key] = (version, wheel)
+  return _distributions[key]
+
+def _log_and_exit(*args, **kwargs):
+  import traceback
+
+  # Log error if the uninstallation failed
+  logger.error(*args, **kwargs)
+
+  # Capture and format the exception information
+  exc_type, exc_value, _trace = sys.exc_info()
+  exc_desc_lines = traceback.format_exception_only(exc_type, exc_value)
+  exc_desc = "".join(exc_desc_lines).rstrip()
+
+  # Log the exception details
+  logger.error(exc_desc)
+
+  # Exit the script with an error status
+  sys.exit(1)
+
+def _create(source, source_version, target, target_version, output_directory):
+  # Check if the target version is not a specifier
+  if target_version and _SPECIFIER_CHARS.isdisjoint(target_version):
+    # Format it as a specifier
+    target_version = f"=={target_version}"
+
+  # Generate the transient package and write it to the target directory
+  wheel_file = create_transient_package(
+    name=source,
+    version=source_version or "0.0.0",
+    requirements=[
+      target + target_version if target_version else target,
+    ],
+    target=output_directory,
+  )
+
+  # Log the creation of the transient package
+  logger.info("created transient package '%s'", source)
+
+  # Return the path to the created wheel file
+  return wheel_file
+
+def _pair_packages(source, source_version, target, target_version):
+  # Check that every source package has a target package
+  if len(source) != len(target):
+    raise click.UsageError("'--source' and '--target' must be given the same number of times")
+
+  # Check that versions are either omitted or given for every package
+  for option, versions in (("--source-version", source_version), ("--target-version", target_version)):
+    if versions and len(versions) != len(source):
+      raise click.UsageError(f"'{option}' must be given either once per '--source' or not at all")
+
+  # Pad omitted versions with None
+  source_version = source_version or (None,) * len(source)
+  target_version = target_version or (None,) * len(source)
+
+  return list(zip(source, source_version, target, target_version))
+
+def _prepare_install(source, source_version, target, target_version, interpreter):
+  import importlib.metadata
+  import subprocess
+
+  # Initialize flag to track if source package is installed
+  source_installed = False
+
+  try:
+    # Retrieve the version and the wheel metadata for the specified package
+    installed_version, wheel = _get_distribution(interpreter, source)
+  except (importlib.metadata.PackageNotFoundError, subprocess.CalledProcessError):
+    # Proceed if source package is not installed
+    installed_version, wheel = None, ""
+
+  # Check if the package is transient
+  if TRANSIENT_GENERATOR in wheel:
+    # Log the status of the source package
+    logger.info("source package '%s' is already transient", source)
+
+    # Skip the package
+    return None, source_installed
+
+  # Detect the source version if not provided
+  if source_version is None and installed_version is not None:
+    # Use the version of the installed source package
+    source_version = installed_version
+
+    # Mark source package as installed
+    source_installed = True
+
+    # Log detected source package version
+    logger.info("detected '%s' with version '%s'", source, source_version)
+
+    # If target version is not provided
+    if target_version is None:
+      # Extract the release segment from the source version string
+      match = _RELEASE_RE.match(source_version)
+
+      if match:
+        # Missing minor and micro components default to zero
+        major, minor, micro = (int(part or 0) for part in match.groups())
+
+        # Define minimum and maximum version strings
+        tgt_min = f"{major}.{minor}.{micro}"
+        tgt_max = f"{major}.{minor}.{micro + 1}"
+
+        # Update the specifier with the version range that includes all post-releases
+        target_version = f"<{tgt_max},>={tgt_min}" 
+
+  return (source, source_version, target, target_version), source_installed
+
+def _create_all(source, source_version, target, target_version, output_directory):
+  # Generate each transient package
+  for package in _pair_packages(source, source_version, target, target_version):
+    _create(*package, output_directory)
+
+def _install(source, source_version, target, target_version, interpreter, assume_not_installed):
+  import concurrent.futures
+  import subprocess
+  import tempfile
+
+  # Collect the source packages that need to be uninstalled
+  installed_sources = []
+
+  # Collect the transient packages that need to be installed
+  packages = []
+  for package in _pair_packages(source, source_version, target, target_version):
+    if assume_not_installed:
+      # Skip probing the source package if it is known to be not installed
+      installed = False
+    else:
+      package, installed = _prepare_install(*package, interpreter)
+
+    if package is not None:
+      packages.append(package)
+
+      if installed:
+        installed_sources.append(package[0])
+
+  # Exit if all source packages are already transient
+  if not packages:
+    return
+
+  if installed_sources:
+    try:
+      # Uninstall the source packages
+      _spawn_and_wait([interpreter, "-m", "pip", "uninstall", "--yes", *installed_sources])
+    except subprocess.CalledProcessError:
+      _log_and_exit("failed to uninstall '%s'", "', '".join(installed_sources))
+
+    # Log the uninstallation of the source packages
+    for name in installed_sources:
+      logger.info("uninstalled source package '%s'", name)
+
+  # Create a temporary directory for the transient packages, optionally in TRANSIENT_TMPDIR
+  with tempfile.TemporaryDirectory(dir=os.environ.get("TRANSIENT_TMPDIR") or None) as directory:
+    # Create the transient packages
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+      wheel_files = list(executor.map(lambda package: _create(*package, directory), packages))
+
+    # Build the pip command line
+    args = [interpreter, "-m", "pip", "install", *wheel_files]
+
+    try:
+      # Install the transient packages
+      _spawn_and_wait(args)
+    except subprocess.CalledProcessError:
+      _log_and_exit("failed to install '%s'", "', '".join(package[0] for package in packages))
+
+    # Log the installation of the transient packages
+    for package in packages:
+      logger.info("installed transient package '%s'", package[0])
+
+def _uninstall(interpreter, package):
+  import importlib.metadata
+  import subprocess
+
+  for name in package:
+    try:
+      # Retrieve the wheel metadata for the specified package
+      _version, wheel = _get_distribution(interpreter, name)
+    except (importlib.metadata.PackageNotFoundError, subprocess.CalledProcessError):
+      _log_and_exit("package '%s' not found", name)
+
+    # Check if the package is transient
+    if TRANSIENT_GENERATOR not in wheel:
+      # Log error if the package is not transient
+      logger.error("package '%s' is not transient", name)
+
+      # Exit the script with an error status
+      sys.exit(1)
+
+  try:
+    # Uninstall the transient packages
+    _spawn_and_wait([interpreter, "-m", "pip", "uninstall", "--yes", *package])
+  except subprocess.CalledProcessError:
+    _log_and_exit("failed to uninstall '%s'", "', '".join(package))
+
+  # Log successful uninstallation of transient packages
+  for name in package:
+    logger.info("uninstalled transient package '%s'", name)
+
+##### ##### ##### ##### #####
+
+@click.group()
+def main():
+  # Configure logging
+  logging.basicConfig(format="[%(levelname)s] %(asctime)s  %(message)s", level=logging.INFO)
+
+@main.command()
+@create_options
+@click.option(
+  "-od",
+  "--output-directory",
+  help="""
+    Directory path where the output wheel file will be saved
+  """,
+  required=True,
+  type=click.Path(exists=True, file_okay=False, dir_okay=True),
+)
+def create(*args, **kwargs):
+  """
+  Generate transient package.
+
+  This command generates "transient" packages, which are essentially empty
+  packages designed to depend on a specified "target" package that replaces an
+  existing "source" package.
+
+  If the source package version is not specified, it defaults to "0.0.0".
+
+  If the target package version is not specified, it defaults to the latest
+  version.
+
+  Multiple packages can be generated by repeating the "--source" and
+  "--target" options.
+  """
+
+  return _create_all(*args, **kwargs)
+
+@main.command()
+@create_options
+@pip_options
+@click.option(
+  "--assume-not-installed",
+  help="""
+    Do not check whether the source package is installed
+  """,
+  is_flag=True,
+)
+def install(*args, **kwargs):
+  """
+  Generate and install transient package.
+
+  This command generates "transient" packages, which are essentially empty
+  packages designed to depend on a specified "target" package that replaces an
+  existing "source" package, and installs it.
+
+  If the source package version is not provided, the command will try to
+  detect it automatically.
+
+  If detection is unsuccessful, the version defaults to "0.0.0".
+
+  If the target package version is not specified and the source package
+  version is successfully detected, the command will use the source package
+  version, but will also include all post-releases.
+
+  If detection is unsuccessful, the command defaults to using the latest version.
+
+  This command uninstalls the source package before proceeding.
+
+  If "--assume-not-installed" is given, the source package is not checked
+  and the transient package is installed as if it were absent.
+
+  Multiple packages can be installed at once by repeating the "--source" and
+  "--target" options.
+
+  The transient packages are built in a temporary directory, which can be
+  placed elsewhere (e.g. "/dev/shm") with the TRANSIENT_TMPDIR environment
+  variable.
+  """
+
+  return _install(*args, **kwargs)
+
+@main.command()
+@pip_options
+@click.argument("package", nargs=-1, required=True)
+def uninstall(*args, **kwargs):
+  """
+  Uninstall transient package.
+
+  This command uninstalls transient packages. It does nothing with
+  non-transient packages.
+
+  Multiple packages can be uninstalled at once.
+  """
+
+  return _uninstall(*args, **kwargs)
+
+##### ##### ##### ##### #####
+
+#
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,76 @@
+import os
+import typing
+
+from ._version import __version__
+
+# Set the package name to "transient_package" if it's not already defined
+if not __package__:
+  package = "transient_package"
+
+# Generator string as in the wheel metadata
+TRANSIENT_GENERATOR = f"Generator: {__package__}"
+
+def create_transient_package(name: str,
+                             version: str,
+                             requirements: typing.List[str],
+                             target: str,
+                             *,
+                             tag: str = "py3-none-any") -> str:
+  """
+    Create a transient wheel package and return the path to the wheel file.
+
+    Parameters
+    ----------
+    name         : str
+                   The name of the package.
+    version      : str
+                   The version of the package.
+    requirements : List[str]
+                   The list of package requirements.
+    target       : str
+                   The output directory where the package will be saved.
+    tag          : str
+                   The wheel tag (e.g., "py3-none-any").
+
+    Returns
+    -------
+    str
+      The path to the created wheel file.
+  """
+
+  import wheel.wheelfile
+  import zipfile
+
+  # Define the path for the wheel file
+  wheel_file = os.path.join(target, f"{name}-{version}-{tag}.whl")
+
+  # Define the prefix of the .dist-info directory inside the wheel
+  dist_info = f"{name}-{version}.dist-info/"
+
+  # Build package metadata for the METADATA file
+  metadata = (
+    "Metadata-Version: 2.1\n"
+    f"Name: {name}\n"
+    f"Version: {version}\n"
+    + "".join(f"Requires-Dist: {requirement}\n" for requirement in requirements)
+    + "\n"
+  )
+
+  # Build wheel metadata for the WHEEL file
+  wheel_metadata = (
+    "Wheel-Version: 1.0\n"
+    f"Generator: {__package__} ({__version__})\n"
+    "Root-Is-Purelib: true\n"
+    f"Tag: {tag}\n"
+    "\n"
+  )
+
+  # Create the wheel file directly from the in-memory files, without compression
+  with wheel.wheelfile.WheelFile(wheel_file, "w", compression=zipfile.ZIP_STORED) as whl:
+    whl.writestr(dist_info + "METADATA", metadata)
+    whl.writestr(dist_info + "WHEEL", wheel_metadata)
+
+    # Create an empty top_level.txt file
+    whl.writestr(dist_info + "top_level.txt", "\n")
+
+  return wheel_file
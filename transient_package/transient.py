@@ -1,19 +1,12 @@
-import importlib.metadata
 import os
-import tempfile
 import typing
-import wheel.wheelfile
+
+from ._version import __version__
 
 # Set the package name to "transient_package" if it's not already defined
 if not __package__:
   package = "transient_package"
 
-# Attempt to retrieve the package version or use "0.0.0" as a fallback
-try:
-  __version__ = importlib.metadata.version(__package__)
-except importlib.metadata.PackageNotFoundError:
-  __version__ = "0.0.0"
-
 # Generator string as in the wheel metadata
 TRANSIENT_GENERATOR = f"Generator: {__package__}"
 
@@ -22,9 +15,9 @@ def create_transient_package(name: str,
                              requirements: typing.List[str],
                              target: str,
                              *,
-                             tag: str = "py3-none-any"):
+                             tag: str = "py3-none-any") -> str:
   """
-    Create a transient wheel package and return it as a bytes object.
+    Create a transient wheel package and return the path to the wheel file.
 
     Parameters
     ----------
@@ -38,38 +31,46 @@ def create_transient_package(name: str,
                    The output directory where the package will be saved.
     tag          : str
                    The wheel tag (e.g., "py3-none-any").
+
+    Returns
+    -------
+    str
+      The path to the created wheel file.
   """
 
-  # Create a temporary directory for the package files
-  with tempfile.TemporaryDirectory() as directory:
-    # Define the path for the wheel file
-    wheel_file = os.path.join(target, f"{name}-{version}-{tag}.whl")
+  import wheel.wheelfile
+  import zipfile
 
-    # Create the .dist-info directory inside the source directory
-    dist_info = os.path.join(directory, f"{name}-{version}.dist-info")
-    os.makedirs(dist_info)
+  # Define the path for the wheel file
+  wheel_file = os.path.join(target, f"{name}-{version}-{tag}.whl")
 
-    # Write package metadata to the METADATA file
-    with open(os.path.join(dist_info, "METADATA"), "w") as file:
-      file.write("Metadata-Version: 2.1\n")
-      file.write(f"Name: {name}\n")
-      file.write(f"Version: {version}\n")
-      for requirement in requirements:
-        file.write(f"Requires-Dist: {requirement}\n")
-      file.write("\n")
+  # Define the prefix of the .dist-info directory inside the wheel
+  dist_info = f"{name}-{version}.dist-info/"
 
-    # Create an empty top_level.txt file
-    with open(os.path.join(dist_info, "top_level.txt"), "w") as file:
-      file.write("\n")
+  # Build package metadata for the METADATA file
+  metadata = (
+    "Metadata-Version: 2.1\n"
+    f"Name: {name}\n"
+    f"Version: {version}\n"
+    + "".join(f"Requires-Dist: {requirement}\n" for requirement in requirements)
+    + "\n"
+  )
 
-    # Write wheel metadata to the WHEEL file
-    with open(os.path.join(dist_info, "WHEEL"), "w") as file:
-      file.write("Wheel-Version: 1.0\n")
-      file.write(f"Generator: {__package__} ({__version__})\n")
-      file.write("Root-Is-Purelib: true\n")
-      file.write(f"Tag: {tag}\n")
-      file.write("\n")
+  # Build wheel metadata for the WHEEL file
+  wheel_metadata = (
+    "Wheel-Version: 1.0\n"
+    f"Generator: {__package__} ({__version__})\n"
+    "Root-Is-Purelib: true\n"
+    f"Tag: {tag}\n"
+    "\n"
+  )
+
+  # Create the wheel file directly from the in-memory files, without compression
+  with wheel.wheelfile.WheelFile(wheel_file, "w", compression=zipfile.ZIP_STORED) as whl:
+    whl.writestr(dist_info + "METADATA", metadata)
+    whl.writestr(dist_info + "WHEEL", wheel_metadata)
+
+    # Create an empty top_level.txt file
+    whl.writestr(dist_info + "top_level.txt", "\n")
 
-    # Create the wheel file from the source directory
-    with wheel.wheelfile.WheelFile(wheel_file, "w") as whl:
-      whl.write_files(directory)
+  return wheel_file